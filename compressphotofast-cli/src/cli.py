@@ -1,8 +1,10 @@
 import os
 import sys
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from pathlib import Path
+import atexit
 import concurrent.futures
+import functools
 import multiprocessing
 
 import click
@@ -39,11 +41,44 @@ from .constants import (
     APP_DIRECTORY,
 )
 from .stats import CompressionStats
-from .multiprocessing_utils import ProcessSafeStats, process_single_file, process_single_file_dry_run
+from .multiprocessing_utils import (
+    SkipReason,
+    format_error,
+    format_skip_reason,
+    init_worker,
+    process_single_file,
+    process_single_file_dry_run,
+)
 
 
 console = Console()
 
+# Пул процессов живёт столько же, сколько CLI: повторные запуски обработки
+# (dry-run + сжатие в одной сессии) не платят заново за spawn интерпретаторов
+# и импорт PIL в каждом воркере
+_EXECUTOR: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def _get_executor(num_workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        # initializer прогревает Pillow в каждом воркере один раз при
+        # старте, а не на первой задаче
+        _EXECUTOR = concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+        )
+        atexit.register(_shutdown_executor)
+    return _EXECUTOR
+
+
+def _shutdown_executor() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+
 
 @click.group()
 def cli():
@@ -182,19 +217,18 @@ def compress(
             )
         )
 
-    # Use process-safe stats for both compression and dry-run (both are now multi-process)
-    # Create a multiprocessing.Manager for shared locks
-    manager = multiprocessing.Manager()
-    stats = ProcessSafeStats(manager_lock=manager.Lock())
+    # Статистику мутирует только главный процесс, складывая результаты
+    # воркеров по мере готовности futures — межпроцессные блокировки
+    # (и Manager с его прокси-процессом) здесь не нужны
+    stats = CompressionStats()
 
     if path.is_file():
         if not ImageCompressor.is_supported_file(str(path)):
             console.print(f"[red]Error:[/red] Unsupported file format: {path}")
             return
 
-        files = [
-            FileInfo(str(path), path.name, path.stat().st_size, path.stat().st_mtime)
-        ]
+        st = path.stat()
+        files = [FileInfo(str(path), path.name, st.st_size, st.st_mtime)]
     else:
         console.print("[dim]Scanning for images...[/dim]")
         files = find_image_files(
@@ -267,6 +301,40 @@ def compress(
     stats.print_summary()
 
 
+def _front_filter(
+    files: List[FileInfo], force: bool
+) -> Tuple[List[FileInfo], List[Tuple[FileInfo, SkipReason]]]:
+    """
+    Отсеивает очевидные пропуски до раздачи задач в пул процессов.
+
+    Размер уже лежит в FileInfo, а маркер сжатия виден дешёвым зондом по
+    первым 64 КБ — таким файлам незачем платить за pickle туда-обратно и
+    планирование задачи: в инкрементальных прогонах это большинство.
+
+    Returns:
+        Кортеж (to_process, skipped), где skipped — список пар
+        (FileInfo, SkipReason)
+    """
+    if force:
+        return files, []
+
+    to_process = []
+    skipped = []
+    for file_info in files:
+        if is_already_small(file_info.size):
+            skipped.append((file_info, SkipReason.ALREADY_SMALL))
+        elif (
+            ExifHandler.probe_compression_marker(file_info.path)
+            and ExifHandler.get_compression_info(file_info.path)[0]
+        ):
+            # Зонд может дать ложное срабатывание на байтах изображения,
+            # поэтому попадание подтверждается полным разбором маркера
+            skipped.append((file_info, SkipReason.ALREADY_COMPRESSED))
+        else:
+            to_process.append(file_info)
+    return to_process, skipped
+
+
 def _run_dry_run(
     files: List[FileInfo], quality: int, force: bool, stats: CompressionStats
 ):
@@ -299,68 +367,74 @@ def _run_dry_run(
             total=len(files)
         )
 
-        # Use ProcessPoolExecutor for parallel processing (CPU-bound task)
-        executor = concurrent.futures.ProcessPoolExecutor(
-            max_workers=num_workers,
-            mp_context=multiprocessing.get_context('spawn')
-        )
-        
-        try:
-            # Submit all tasks
-            future_to_file = {
-                executor.submit(
-                    process_single_file_dry_run,
-                    file_info,
-                    quality,
-                    force
-                ): file_info for file_info in files
-            }
-
-            # Process results as they complete
-            for future in concurrent.futures.as_completed(future_to_file):
-                file_info = future_to_file[future]
-
-                try:
-                    result_data = future.result()
-                    file_info, should_process, skip_reason, test_result = result_data
-
-                    # Add to stats
-                    if should_process and test_result:
-                        stats.add_result(test_result, skipped=False, reason="")
-                    else:
-                        stats.add_result(
-                            CompressionResult(False, file_info.size, 0),
-                            skipped=True,
-                            reason=skip_reason,
-                        )
-
-                    # Add to table
-                    status = (
-                        "[green]Will compress[/green]" if should_process else "[red]Skip[/red]"
-                    )
-                    # Get compressed size if available
-                    compressed_size_str = "-"
-                    if should_process and test_result and test_result.success:
-                        compressed_size_str = format_size(test_result.compressed_size)
+        # Use the persistent ProcessPoolExecutor (CPU-bound task)
+        executor = _get_executor(num_workers)
+        result_batch = []
+
+        # Очевидные пропуски обрабатываются в главном процессе без IPC
+        to_process, pre_skipped = _front_filter(files, force)
+        for file_info, skip_reason in pre_skipped:
+            result_batch.append((
+                CompressionResult(False, file_info.size, 0),
+                True,
+                skip_reason,
+            ))
+            table.add_row(
+                file_info.name,
+                format_size(file_info.size),
+                "-",
+                "[red]Skip[/red]",
+                format_skip_reason(skip_reason),
+            )
+            progress.update(task, advance=1)
 
-                    table.add_row(
-                        file_info.name, format_size(file_info.size), compressed_size_str, status, skip_reason
-                    )
+        # Воркеры возвращают только путь — FileInfo восстанавливаем по индексу
+        info_by_path = {f.path: f for f in to_process}
 
-                except Exception as e:
-                    # Future raised exception (shouldn't happen due to try/except in worker)
-                    table.add_row(
-                        file_info.name,
-                        format_size(file_info.size),
-                        "-",  # No compressed size on error
-                        "[red]Error[/red]",
-                        str(e)
-                    )
-                    stats.add_result(
+        try:
+            # executor.map с подобранным chunksize вместо submit на каждый
+            # файл: задачи уходят в воркеры пачками, результаты стримятся
+            # по мере готовности, и нет словаря futures на все файлы разом
+            chunksize = max(1, len(to_process) // (num_workers * 4)) if to_process else 1
+            # Константные аргументы связываются в partial один раз и уходят
+            # в воркер вместе с функцией по разу на чанк — вместо копии
+            # каждого аргумента на каждый файл
+            worker = functools.partial(
+                process_single_file_dry_run, quality=quality, force=force
+            )
+            results = executor.map(worker, to_process, chunksize=chunksize)
+
+            for path, should_process, skip_reason, skip_detail, test_result in results:
+                file_info = info_by_path[path]
+                # Подпись причины собирается здесь, в главном процессе —
+                # через IPC пришёл только код SkipReason и детали ошибки
+                reason_label = format_skip_reason(skip_reason, skip_detail)
+
+                # Накапливаем результаты и сворачиваем их в статистику одной
+                # пачкой после цикла — без обновления счётчиков на каждый файл
+                if should_process and test_result:
+                    result_batch.append((test_result, False, SkipReason.NONE))
+                else:
+                    # В статистику уходит код причины; подпись нужна только
+                    # для таблицы и собирается в print_summary заново
+                    result_batch.append((
                         CompressionResult(False, file_info.size, 0),
-                        skipped=True,
-                        reason=f"Error: {e}"
-                    )
+                        True,
+                        skip_reason,
+                    ))
+
+                # Add to table
+                status = (
+                    "[green]Will compress[/green]" if should_process else "[red]Skip[/red]"
+                )
+                # Get compressed size if available
+                compressed_size_str = "-"
+                if should_process and test_result and test_result.success:
+                    compressed_size_str = format_size(test_result.compressed_size)
+
+                table.add_row(
+                    file_info.name, format_size(file_info.size), compressed_size_str, status, reason_label
+                )
 
                 # Update progress bar
                 progress.update(
@@ -369,11 +443,11 @@ def _run_dry_run(
                     description=f"Analyzing: {file_info.name[:50]}..."
                 )
         except KeyboardInterrupt:
-            # User interrupted - shutdown executor and show partial results
+            # User interrupted - cancel pending work and show partial results
             console.print("\n[yellow]⚠ Interrupted by user. Showing partial results...[/yellow]")
-        finally:
-            # Always shutdown executor, cancel futures on interrupt
-            executor.shutdown(wait=False, cancel_futures=True)
+            _shutdown_executor()
+
+        stats.add_results_batch(result_batch)
 
     console.print(table)
 
@@ -391,12 +465,6 @@ def _run_compression(
     # Determine number of worker processes (use CPU cores for CPU-bound tasks)
     num_workers = os.cpu_count() or 1
 
-    # Ensure stats is ProcessSafeStats for multi-process operation
-    if not isinstance(stats, ProcessSafeStats):
-        console.print("[yellow]Warning: Using non-process-safe stats in multi-process mode[/yellow]")
-        # Fallback to sequential processing
-        num_workers = 1
-
     # Create a fixed-width column for progress descriptions to prevent flickering
     description_column = Column(width=60, overflow="ellipsis")
 
@@ -414,80 +482,89 @@ def _run_compression(
             total=len(files)
         )
 
-        # Use ProcessPoolExecutor for parallel processing (CPU-bound task)
-        executor = concurrent.futures.ProcessPoolExecutor(
-            max_workers=num_workers,
-            mp_context=multiprocessing.get_context('spawn')
-        )
-        
+        # Use the persistent ProcessPoolExecutor (CPU-bound task)
+        executor = _get_executor(num_workers)
+        result_batch = []
+
+        # Очевидные пропуски обрабатываются в главном процессе без IPC
+        to_process, pre_skipped = _front_filter(files, force)
+        for file_info, skip_reason in pre_skipped:
+            console.print(
+                f"  [yellow]-[/yellow] {file_info.name}: "
+                f"{format_skip_reason(skip_reason)}"
+            )
+            result_batch.append((
+                CompressionResult(False, file_info.size, 0),
+                True,
+                skip_reason,
+            ))
+            progress.update(task, advance=1)
+
+        # Воркеры возвращают только путь — FileInfo восстанавливаем по индексу
+        info_by_path = {f.path: f for f in to_process}
+
         try:
-            # Submit all tasks
-            future_to_file = {
-                executor.submit(
-                    process_single_file,
-                    file_info,
-                    quality,
-                    replace,
-                    output_dir,
-                    force
-                ): file_info for file_info in files
-            }
-
-            # Process results as they complete
-            for future in concurrent.futures.as_completed(future_to_file):
-                file_info = future_to_file[future]
-
-                try:
-                    result_data = future.result()
-                    file_info, result, skipped, skip_reason, error_msg = result_data
-
-                    # Display result
-                    if error_msg:
-                        console.print(f"  [red]X[/red] {file_info.name}: {error_msg}")
-                        # Add failure to stats
-                        stats.add_result(
-                            CompressionResult(False, file_info.size, 0, None, error_msg)
-                        )
-                    elif skipped:
-                        console.print(f"  [yellow]-[/yellow] {file_info.name}: {skip_reason}")
-                        stats.add_result(
-                            CompressionResult(False, file_info.size, 0),
-                            skipped=True,
-                            reason=skip_reason,
-                        )
-                    elif result and result.success and result.saved_path:
-                        saved_percent = result.size_reduction
-                        console.print(
-                            f"  [green]+[/green] {file_info.name}: "
-                            f"{format_size(result.original_size)} → "
-                            f"{format_size(result.compressed_size)} "
-                            f"([green]{saved_percent:.1f}%[/green])"
-                        )
-
-                        if hasattr(result, 'metadata_preserved') and not result.metadata_preserved:
-                            if "PNG" in result.message:
-                                console.print(f"    [yellow]![/yellow] PNG file saved without EXIF metadata")
-                            else:
-                                console.print(f"    [yellow]![/yellow] Metadata loss detected")
-                                if hasattr(result, 'metadata_details') and result.metadata_details:
-                                    lost_tags = [tag for tag, (src, tgt, eq) in result.metadata_details.items()
-                                                if src and not tgt]
-                                    if lost_tags:
-                                        console.print(f"      Lost tags: {', '.join(lost_tags[:5])}...")
-
-                        stats.add_result(result)
-                    elif result:
-                        # Compression failed
-                        console.print(f"  [red]X[/red] {file_info.name}: {result.message}")
-                        stats.add_result(result)
-
-                except Exception as e:
-                    # Future raised exception (shouldn't happen due to try/except in worker)
-                    console.print(f"  [red]X[/red] {file_info.name}: Process error: {e}")
-                    stats.add_result(
-                        CompressionResult(False, file_info.size, 0, None, str(e))
+            # Пакетная раздача задач через executor.map (см. _run_dry_run)
+            chunksize = max(1, len(to_process) // (num_workers * 4)) if to_process else 1
+            # См. _run_dry_run: константы связаны в partial, по пайпу на файл
+            # идёт только FileInfo
+            worker = functools.partial(
+                process_single_file,
+                quality=quality,
+                replace=replace,
+                output_dir=output_dir,
+                force=force,
+            )
+            results = executor.map(worker, to_process, chunksize=chunksize)
+
+            for path, result, skipped, skip_reason, error in results:
+                file_info = info_by_path[path]
+                error_kind, error_detail = error
+                # Display result
+                if error_kind:
+                    # Подпись ошибки собирается из кода здесь, а не в воркере
+                    error_msg = format_error(error_kind, error_detail)
+                    console.print(f"  [red]X[/red] {file_info.name}: {error_msg}")
+                    # Add failure to stats
+                    result_batch.append((
+                        CompressionResult(False, file_info.size, 0, None, error_msg),
+                        False,
+                        SkipReason.NONE,
+                    ))
+                elif skipped:
+                    reason_label = format_skip_reason(skip_reason)
+                    console.print(f"  [yellow]-[/yellow] {file_info.name}: {reason_label}")
+                    result_batch.append((
+                        CompressionResult(False, file_info.size, 0),
+                        True,
+                        skip_reason,
+                    ))
+                elif result and result.success and result.saved_path:
+                    saved_percent = result.size_reduction
+                    console.print(
+                        f"  [green]+[/green] {file_info.name}: "
+                        f"{format_size(result.original_size)} → "
+                        f"{format_size(result.compressed_size)} "
+                        f"([green]{saved_percent:.1f}%[/green])"
                     )
 
+                    if hasattr(result, 'metadata_preserved') and not result.metadata_preserved:
+                        if "PNG" in result.message:
+                            console.print(f"    [yellow]![/yellow] PNG file saved without EXIF metadata")
+                        else:
+                            console.print(f"    [yellow]![/yellow] Metadata loss detected")
+                            if hasattr(result, 'metadata_details') and result.metadata_details:
+                                lost_tags = [tag for tag, (src, tgt, eq) in result.metadata_details.items()
+                                            if src and not tgt]
+                                if lost_tags:
+                                    console.print(f"      Lost tags: {', '.join(lost_tags[:5])}...")
+
+                    result_batch.append((result, False, SkipReason.NONE))
+                elif result:
+                    # Compression failed
+                    console.print(f"  [red]X[/red] {file_info.name}: {result.message}")
+                    result_batch.append((result, False, SkipReason.NONE))
+
                 # Update progress bar
                 progress.update(
                     task,
@@ -495,13 +572,11 @@ def _run_compression(
                     description=f"Processing: {file_info.name[:50]}..."
                 )
         except KeyboardInterrupt:
-            # User interrupted - shutdown executor and show partial results
+            # User interrupted - cancel pending work and show partial results
             console.print("\n[yellow]⚠ Interrupted by user. Showing partial results...[/yellow]")
-        finally:
-            # Always shutdown executor, cancel futures on interrupt
-            executor.shutdown(wait=False, cancel_futures=True)
+            _shutdown_executor()
 
-    # No need to cleanup .lock files - not used in multiprocessing mode
+        stats.add_results_batch(result_batch)
 
 
 @cli.command()
@@ -1,7 +1,10 @@
+import functools
 import os
 import shutil
+import stat
 import time
 import logging
+from dataclasses import dataclass
 from typing import Tuple, Optional, Dict
 from PIL import Image
 import io
@@ -23,6 +26,7 @@ from .constants import (
     SUPPORTED_EXTENSIONS,
 )
 from .exif_handler import ExifHandler
+from .file_utils import invalidate_compressed_dir_cache
 
 # Попытка инициализации поддержки HEIC
 try:
@@ -33,7 +37,96 @@ except ImportError:
     HEIC_SUPPORT_AVAILABLE = False
 
 
+# Магические байты поддерживаемых форматов (для проверки содержимого файла)
+_MAGIC_JPEG = b"\xff\xd8\xff"
+_MAGIC_PNG = b"\x89PNG\r\n\x1a\n"
+_HEIC_BRANDS = (b"heic", b"heix", b"heif", b"hevc", b"mif1", b"msf1")
+
+
+def _jpeg_save_kwargs(quality: int, fast: bool = False) -> dict:
+    """
+    Параметры сохранения JPEG: subsampling зафиксирован на 4:2:0, а
+    optimize (второй проход оптимизации таблиц Хаффмана, сравнимый по
+    стоимости с основным кодированием) включается только при высоком
+    качестве и отключается в fast-режиме.
+    """
+    kwargs = {"format": "JPEG", "quality": quality, "subsampling": 2}
+    if quality >= 85 and not fast:
+        kwargs["optimize"] = True
+    return kwargs
+
+
+def _sniff_header(header: bytes) -> Optional[str]:
+    """Определяет формат изображения по первым байтам файла."""
+    if header.startswith(_MAGIC_JPEG):
+        return "JPEG"
+    if header.startswith(_MAGIC_PNG):
+        return "PNG"
+    if len(header) >= 12 and header[4:8] == b"ftyp" and header[8:12] in _HEIC_BRANDS:
+        return "HEIC"
+    return None
+
+
+@dataclass(slots=True)
+class FileStat:
+    """
+    Результат одного open+fstat+read для входного файла: путь, размер,
+    расширение и первые байты содержимого.
+
+    Заполняется один раз в compress_image_safe и передаётся вниз по цепочке,
+    чтобы не повторять stat-вызовы и чтение заголовка в
+    is_supported_file/is_processable/compress_image.
+    """
+
+    path: str
+    size: int
+    ext: str
+    header: bytes = b""
+    atime: float = 0.0
+    mtime: float = 0.0
+    mode: int = 0
+
+    @classmethod
+    def from_path(cls, file_path: str) -> "FileStat":
+        try:
+            with open(file_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                header = f.read(64)
+        except OSError:
+            return cls(file_path, 0, os.path.splitext(file_path)[1].lower())
+        return cls(
+            file_path,
+            st.st_size,
+            os.path.splitext(file_path)[1].lower(),
+            header,
+            st.st_atime,
+            st.st_mtime,
+            stat.S_IMODE(st.st_mode),
+        )
+
+    def restore_dates(self, target_path: str) -> bool:
+        """Восстанавливает atime/mtime исходного файла на target_path."""
+        try:
+            os.utime(target_path, (self.atime, self.mtime))
+            return True
+        except OSError:
+            return False
+
+
 class CompressionResult:
+    # Фиксированный набор атрибутов: каждый результат пиклится через границу
+    # процессов, и слоты заменяют __dict__ компактным кортежем состояния —
+    # меньше байтов в канале и быстрее распаковка в главном процессе
+    __slots__ = (
+        "success",
+        "original_size",
+        "compressed_size",
+        "saved_path",
+        "message",
+        "metadata_preserved",
+        "metadata_details",
+    )
+
     def __init__(
         self,
         success: bool,
@@ -65,43 +158,84 @@ class CompressionResult:
         return self.compressed_size <= self.original_size * MIN_COMPRESSION_RATIO
 
 
+# Двойное расширение после конвертации HEIC/HEIF: исходный формат + формат,
+# в который сконвертировали. lower() берётся только от хвоста после точки,
+# а не от всего имени
+_SOURCE_EXTS = frozenset({"heic", "heif"})
+_CONVERTED_EXTS = frozenset({"jpg", "jpeg", "png"})
+
+
+@functools.lru_cache(maxsize=4096)
 def clean_double_extensions(file_name: str) -> str:
     """
     Очищает двойные расширения в имени файла.
+    В пакетной обработке одни и те же имена встречаются повторно —
+    готовый результат берётся из кэша без повторного разбора суффиксов.
     Например: image.HEIC.jpg -> image, photo.heif.jpeg -> photo
 
+    Срезаются только хвосты вида .heic/.heif + .jpg/.jpeg/.png, оставшиеся
+    после конвертации; произвольные точки в имени (my.photo.jpg) остаются
+    частью базового имени.
+
     Args:
         file_name: Исходное имя файла
 
     Returns:
-        Имя файла без двойных расширений (только базовое имя)
+        Имя файла без расширений (только базовое имя)
     """
-    last_dot_index = file_name.rfind('.')
-    if last_dot_index <= 0:
+    # Максимум два rpartition-скана в C; в нижний регистр приводится только
+    # короткий суффикс, без аллокации копии всего имени
+    stem, dot, ext = file_name.rpartition('.')
+    if not dot:
         return file_name
-
-    before_last_dot = file_name[:last_dot_index]
-    second_last_dot = before_last_dot.rfind('.')
-
-    if second_last_dot > 0:
-        # Есть двойное расширение, возвращаем имя до второй точки
-        logger.debug(f"Очистка двойного расширения: {file_name} -> {before_last_dot[:second_last_dot]}")
-        return before_last_dot[:second_last_dot]
-    else:
-        # Двойного расширения нет, возвращаем как есть
-        return before_last_dot
+    if ext.lower() in _CONVERTED_EXTS:
+        inner_stem, inner_dot, inner_ext = stem.rpartition('.')
+        if inner_dot and inner_ext.lower() in _SOURCE_EXTS:
+            return inner_stem
+    return stem
 
 
 class ImageCompressor:
     @staticmethod
-    def is_supported_file(file_path: str) -> bool:
-        ext = os.path.splitext(file_path)[1].lower()
+    def _is_supported_ext(ext: str) -> bool:
         # Проверка поддержки HEIC
         if ext in {".heic", ".heif"}:
             if not HEIC_SUPPORT_AVAILABLE:
                 return False
         return ext in SUPPORTED_EXTENSIONS
 
+    @staticmethod
+    def _is_supported_content(header: bytes) -> bool:
+        fmt = _sniff_header(header)
+        if fmt is None:
+            return False
+        if fmt == "HEIC" and not HEIC_SUPPORT_AVAILABLE:
+            return False
+        return True
+
+    @staticmethod
+    def _sniff_format(file_path: str) -> Optional[str]:
+        """Читает первые байты файла и определяет его реальный формат."""
+        try:
+            with open(file_path, "rb") as f:
+                return _sniff_header(f.read(12))
+        except OSError:
+            return None
+
+    @staticmethod
+    def is_supported_file(file_path: str) -> bool:
+        if not ImageCompressor._is_supported_ext(
+            os.path.splitext(file_path)[1].lower()
+        ):
+            return False
+        # Расширение подходит — подтверждаем по содержимому, чтобы не
+        # отдавать Pillow переименованные или повреждённые файлы
+        try:
+            with open(file_path, "rb") as f:
+                return ImageCompressor._is_supported_content(f.read(12))
+        except OSError:
+            return False
+
     @staticmethod
     def get_file_size(file_path: str) -> int:
         try:
@@ -116,18 +250,18 @@ class ImageCompressor:
 
     @staticmethod
     def compress_to_bytes(
-        image: Image.Image, quality: int, format: str = "JPEG"
+        image: Image.Image, quality: int, format: str = "JPEG", fast: bool = False
     ) -> Tuple[Optional[bytes], int]:
         output = io.BytesIO()
 
         try:
             if format.upper() == "JPEG":
-                image.save(output, format="JPEG", quality=quality, optimize=True)
+                image.save(output, **_jpeg_save_kwargs(quality, fast))
             elif format.upper() == "PNG":
                 image.save(output, format="PNG", optimize=True)
             elif format.upper() in ["HEIC", "HEIF"]:
                 image.convert("RGB").save(
-                    output, format="JPEG", quality=quality, optimize=True
+                    output, **_jpeg_save_kwargs(quality, fast)
                 )
             else:
                 image.save(output, format=format, quality=quality, optimize=True)
@@ -178,6 +312,25 @@ class ImageCompressor:
             and bytes_saving >= MIN_BYTES_SAVING
         )
 
+    @staticmethod
+    def efficiency_mask(original_sizes, compressed_sizes) -> list:
+        """
+        Пакетная версия is_compression_efficient для агрегации отчётов.
+
+        Принимает параллельные последовательности размеров (до, после) и
+        возвращает список bool. Константы порогов вынесены в локальные
+        переменные, а проверка процента переписана без деления —
+        целочисленная арифметика на каждую пару.
+        """
+        min_pct = MIN_COMPRESSION_SAVING_PERCENT
+        min_bytes = MIN_BYTES_SAVING
+        return [
+            orig > 0
+            and (orig - comp) * 100 >= min_pct * orig
+            and (orig - comp) >= min_bytes
+            for orig, comp in zip(original_sizes, compressed_sizes)
+        ]
+
     @staticmethod
     def find_optimal_quality(file_path: str) -> int:
         original_size = ImageCompressor.get_file_size(file_path)
@@ -206,23 +359,30 @@ class ImageCompressor:
         quality: int,
         output_path: Optional[str] = None,
         preserve_exif: bool = True,
+        info: Optional[FileStat] = None,
+        fast: bool = False,
     ) -> CompressionResult:
         try:
-            if not ImageCompressor.is_supported_file(file_path):
-                ext = os.path.splitext(file_path)[1].lower()
-                if ext in {".heic", ".heif"} and not HEIC_SUPPORT_AVAILABLE:
+            if info is None:
+                info = FileStat.from_path(file_path)
+
+            if not ImageCompressor._is_supported_ext(info.ext):
+                if info.ext in {".heic", ".heif"} and not HEIC_SUPPORT_AVAILABLE:
                     return CompressionResult(
                         False, 0, 0, None,
                         "HEIC/HEIF support not available. Install pillow-heif."
                     )
                 return CompressionResult(False, 0, 0, None, "Unsupported file format")
 
-            if not ImageCompressor.is_processable(file_path):
+            if info.size < MIN_PROCESSABLE_FILE_SIZE:
                 return CompressionResult(
                     False, 0, 0, None, "File too small for compression"
                 )
 
-            original_size = ImageCompressor.get_file_size(file_path)
+            if not ImageCompressor._is_supported_content(info.header):
+                return CompressionResult(False, 0, 0, None, "Unsupported file format")
+
+            original_size = info.size
 
             with Image.open(file_path) as img:
                 format = img.format or "JPEG"
@@ -247,25 +407,25 @@ class ImageCompressor:
                     except Exception:
                         exif_bytes = None
 
+                # Кодируем в память: размер сразу известен из буфера (без stat),
+                # а при неэффективном сжатии запись на диск не выполняется вовсе
+                buf = io.BytesIO()
+
                 # Save with EXIF for JPEG, without for PNG
                 if format.upper() == "JPEG":
+                    save_kwargs = _jpeg_save_kwargs(quality, fast)
                     if exif_bytes:
-                        img_copy.save(
-                            output_path, format="JPEG", quality=quality, optimize=True, exif=exif_bytes
-                        )
-                    else:
-                        img_copy.save(
-                            output_path, format="JPEG", quality=quality, optimize=True
-                        )
+                        save_kwargs["exif"] = exif_bytes
+                    img_copy.save(buf, **save_kwargs)
                 elif format.upper() == "PNG":
                     # PNG files are saved without EXIF metadata
-                    img_copy.save(output_path, format="PNG", optimize=True)
+                    img_copy.save(buf, format="PNG", optimize=True)
                 else:
                     img_copy.save(
-                        output_path, format=format, quality=quality, optimize=True
+                        buf, format=format, quality=quality, optimize=True
                     )
 
-            compressed_size = ImageCompressor.get_file_size(output_path)
+            compressed_size = buf.getbuffer().nbytes
 
             if not ImageCompressor.is_compression_efficient(
                 original_size, compressed_size
@@ -278,7 +438,7 @@ class ImageCompressor:
                 # Add marker for inefficient compression, preserving all source metadata
                 ExifHandler.add_compression_marker(file_path, 99, source_exif)
                 if format.upper() == "PNG":
-                    return CompressionResult(
+                    result = CompressionResult(
                         True,
                         original_size,
                         compressed_size,
@@ -287,7 +447,7 @@ class ImageCompressor:
                         metadata_preserved=False,
                     )
                 else:
-                    return CompressionResult(
+                    result = CompressionResult(
                         True,
                         original_size,
                         compressed_size,
@@ -295,6 +455,14 @@ class ImageCompressor:
                         "Compression not efficient (marker added with metadata)",
                         metadata_preserved=(source_exif is not None),
                     )
+                return result
+
+            # Одна запись готового буфера одним системным вызовом
+            fd = os.open(output_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, buf.getbuffer())
+            finally:
+                os.close(fd)
 
             # Validate metadata preservation
             metadata_preserved = True
@@ -319,7 +487,7 @@ class ImageCompressor:
                 metadata_preserved = False
                 metadata_details = None
 
-            return CompressionResult(
+            result = CompressionResult(
                 True,
                 original_size,
                 compressed_size,
@@ -328,6 +496,7 @@ class ImageCompressor:
                 metadata_preserved=metadata_preserved,
                 metadata_details=metadata_details,
             )
+            return result
         except Exception as e:
             return CompressionResult(False, 0, 0, None, f"Error: {str(e)}")
 
@@ -338,16 +507,24 @@ class ImageCompressor:
         quality: int,
         replace_mode: bool = False,
         output_dir: Optional[str] = None,
+        fast: bool = False,
     ) -> CompressionResult:
-        original_size = ImageCompressor.get_file_size(file_path)
+        # Единственный stat на входной файл: дальше размер и расширение
+        # передаются через info, без повторных обращений к файловой системе
+        info = FileStat.from_path(file_path)
+        original_size = info.size
 
         if replace_mode:
             backup_path = file_path + ".bak"
 
             try:
                 # Create backup before compression
+                # copyfile вместо copy2: на Linux данные копируются через
+                # copy_file_range без пользовательских буферов, а даты файла
+                # восстанавливаются из уже снятого stat (info), так что
+                # копирование метаданных в backup не нужно
                 try:
-                    shutil.copy2(file_path, backup_path)
+                    shutil.copyfile(file_path, backup_path)
                 except (IOError, OSError) as e:
                     return CompressionResult(
                         False, original_size, 0, None,
@@ -355,22 +532,37 @@ class ImageCompressor:
                     )
 
                 result = ImageCompressor.compress_image(
-                    file_path, quality, file_path, preserve_exif=True
+                    file_path, quality, file_path,
+                    preserve_exif=True, info=info, fast=fast,
                 )
 
-                if not result.success or result.saved_path is None:
+                if result.success and result.saved_path is None:
+                    # Сжатие неэффективно: кодирование шло в память, оригинал
+                    # не перезаписывался, а маркер с исходным EXIF уже
+                    # добавлен внутри compress_image — восстановление из
+                    # backup не нужно
+                    try:
+                        os.remove(backup_path)
+                    except OSError:
+                        pass
+                    return result
+                elif not result.success:
                     try:
                         shutil.move(backup_path, file_path)
                     except (IOError, OSError):
                         pass
-                    # Add marker for inefficient compression after restoring, with source metadata
-                    if result.success and "not efficient" in result.message.lower():
-                        source_exif = ExifHandler.read_exif_data(backup_path)
-                        ExifHandler.add_compression_marker(file_path, 99, source_exif)
+                    # Бэкап создан copyfile и несёт umask-дефолтные права:
+                    # возвращаем исходный st_mode вместе с датами
+                    if info.mode:
+                        try:
+                            os.chmod(file_path, info.mode)
+                        except OSError:
+                            pass
+                    info.restore_dates(file_path)
                     return result
                 else:
-                    # Preserve file dates BEFORE removing backup
-                    ExifHandler.preserve_file_dates(backup_path, file_path)
+                    # Восстанавливаем даты исходника из снятого ранее stat
+                    info.restore_dates(file_path)
                     try:
                         os.remove(backup_path)
                     except OSError:
@@ -396,40 +588,57 @@ class ImageCompressor:
 
             # Определяем расширение для сохранения
             # HEIC/HEIF файлы всегда конвертируются в JPEG
-            _, last_ext = os.path.splitext(base_name)
-            if last_ext.lower() in {".heic", ".heif"}:
+            last_ext = info.ext
+            if last_ext in {".heic", ".heif"}:
                 output_ext = ".jpg"
             else:
                 output_ext = last_ext
 
-            output_name = f"{clean_name}_compressed{output_ext}"
-            output_path = os.path.join(output_dir, output_name)
-
-            # Process-safe filename generation with retry logic
+            # Process-safe filename generation: O_CREAT|O_EXCL атомарно
+            # создаёт файл-заглушку или падает одним системным вызовом,
+            # без stat-проверок и гонок между параллельными воркерами
             max_attempts = 100
-            counter = 1
-
-            for attempt in range(max_attempts):
-                if not os.path.exists(output_path):
-                    break
+            output_path = None
 
+            for counter in range(max_attempts):
                 # Используем то же расширение output_ext, что определено выше
-                output_name = f"{clean_name}_compressed_{counter}{output_ext}"
-                output_path = os.path.join(output_dir, output_name)
-                counter += 1
-
-            # Check if we exhausted all attempts
-            if os.path.exists(output_path):
+                suffix = f"_{counter}" if counter else ""
+                candidate = os.path.join(
+                    output_dir, f"{clean_name}_compressed{suffix}{output_ext}"
+                )
+                try:
+                    fd = os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                except FileExistsError:
+                    continue
+                os.close(fd)
+                output_path = candidate
+                break
+
+            if output_path is None:
                 return CompressionResult(
                     False, original_size, 0, None,
                     "Failed to generate unique filename after 100 attempts"
                 )
 
             result = ImageCompressor.compress_image(
-                file_path, quality, output_path, preserve_exif=True
+                file_path, quality, output_path,
+                preserve_exif=True, info=info, fast=fast,
             )
 
+            if not result.success:
+                # Убираем зарезервированную заглушку, если сжатие не удалось
+                try:
+                    os.remove(output_path)
+                except OSError:
+                    pass
+
             if result.success and result.saved_path:
-                ExifHandler.preserve_file_dates(file_path, output_path)
+                info.restore_dates(output_path)
+
+            # Содержимое каталога приложения изменилось (создан файл или
+            # убрана заглушка) — сбрасываем кэш листинга, иначе
+            # find_compressed_versions отдаёт устаревший список до конца
+            # процесса
+            invalidate_compressed_dir_cache()
 
             return result
@@ -1,8 +1,11 @@
+import concurrent.futures
+import functools
+import multiprocessing
 import os
 import shutil
 import piexif
-from datetime import datetime
-from typing import Tuple, Dict, Optional, Any
+import time
+from typing import Tuple, Dict, List, Optional, Any
 from PIL import Image
 
 from .constants import (
@@ -10,6 +13,47 @@ from .constants import (
     TIME_DIFFERENCE_ALLOWED_SECONDS,
 )
 
+# IFD-секции, которые переносятся из исходного EXIF-словаря
+_IFD_NAMES = ("0th", "Exif", "1st", "GPS", "Interop")
+
+# Ключевые теги для проверки сохранности EXIF: имена переводятся в числовые
+# идентификаторы piexif один раз при загрузке модуля, а не на каждый вызов
+# validate_exif_preservation
+_KEY_TAG_NAMES = {
+    "0th": ["Make", "Model", "Software", "Orientation"],
+    "Exif": [
+        "DateTimeOriginal",
+        "DateTime",
+        "DateTimeDigitized",
+        "ExposureTime",
+        "ExposureBiasValue",
+        "FNumber",
+        "FocalLength",
+        "FocalLengthIn35mmFilm",
+        "PhotographicSensitivity",
+        "ISOSpeedRatings",
+    ],
+    "GPS": [
+        "GPSLatitude",
+        "GPSLatitudeRef",
+        "GPSLongitude",
+        "GPSLongitudeRef",
+        "GPSAltitude",
+    ],
+}
+
+_IFD_TYPES = {"0th": piexif.ImageIFD, "Exif": piexif.ExifIFD, "GPS": piexif.GPSIFD}
+
+# {имя IFD: {числовой id тега: имя тега}}
+_KEY_TAG_IDS = {
+    ifd_name: {
+        tag_id: tag_name
+        for tag_name in tag_names
+        if (tag_id := getattr(_IFD_TYPES[ifd_name], tag_name, None)) is not None
+    }
+    for ifd_name, tag_names in _KEY_TAG_NAMES.items()
+}
+
 
 class ExifHandler:
     EXIF_TAGS_TO_COPY = [
@@ -56,6 +100,12 @@ class ExifHandler:
         "GPSTimeStamp",
     ]
 
+    # APP1(Exif)-сегмент лежит в самом начале JPEG — этого префикса
+    # достаточно, чтобы разобрать EXIF без чтения всего файла
+    _HEADER_READ_SIZE = 65536
+
+    _MARKER_BYTES = EXIF_COMPRESSION_MARKER.encode("ascii")
+
     @staticmethod
     def read_exif_data(file_path: str) -> Optional[Dict[str, Any]]:
         try:
@@ -65,8 +115,76 @@ class ExifHandler:
             return None
 
     @staticmethod
-    def get_compression_info(file_path: str) -> Tuple[bool, int, int]:
-        exif_dict = ExifHandler.read_exif_data(file_path)
+    def read_exif_data_fast(file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Быстрое чтение EXIF для пути предварительного сканирования.
+
+        Читает только первые 64 КБ файла, находит APP1(Exif)-сегмент по
+        маркерам JPEG и отдаёт piexif лишь его payload — вместо полного
+        piexif.load, который разбирает все IFD по всему файлу. При
+        усечённом заголовке откатывается на полный read_exif_data.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read(ExifHandler._HEADER_READ_SIZE)
+        except OSError:
+            return None
+
+        if not data.startswith(b"\xff\xd8"):
+            # Не JPEG — piexif не разберёт EXIF из такого файла и полным путём
+            return None
+
+        pos = 2
+        end = len(data)
+        while pos + 4 <= end:
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker in (0xD9, 0xDA):
+                # EOI/SOS: метаданные закончились, EXIF не встретился
+                return None
+            length = int.from_bytes(data[pos + 2:pos + 4], "big")
+            if length < 2:
+                return None
+            segment_end = pos + 2 + length
+            if segment_end > end:
+                # Сегмент выходит за пределы буфера — нужен полный разбор
+                break
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\x00\x00":
+                try:
+                    return piexif.load(data[pos + 4:segment_end])
+                except Exception:
+                    return None
+            pos = segment_end
+
+        return ExifHandler.read_exif_data(file_path)
+
+    @staticmethod
+    def get_compression_info(
+        file_path: str, stat_result: Optional[os.stat_result] = None
+    ) -> Tuple[bool, int, int]:
+        """
+        Читает маркер сжатия из EXIF с кэшированием по (path, mtime_ns):
+        повторные проверки того же неизменённого файла (is_image_compressed,
+        should_recompress и т.д.) не парсят EXIF заново.
+
+        Args:
+            stat_result: Готовый os.stat вызывающего — избавляет от
+                повторного syscall, если файл уже статили
+        """
+        if stat_result is None:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                return False, -1, 0
+        return ExifHandler._get_compression_info_cached(
+            file_path, stat_result.st_mtime_ns
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _get_compression_info_cached(file_path: str, mtime_ns: int) -> Tuple[bool, int, int]:
+        exif_dict = ExifHandler.read_exif_data_fast(file_path)
         if exif_dict is None:
             return False, -1, 0
 
@@ -115,6 +233,43 @@ class ExifHandler:
             return False
         return True
 
+    @staticmethod
+    def probe_compression_marker(file_path: str) -> bool:
+        """
+        Дешёвый зонд на маркер сжатия: подстрока в первых 64 КБ файла.
+
+        Один read и один поиск байтовой строки вместо разбора EXIF —
+        отрицательный ответ гарантирует отсутствие маркера (EXIF лежит в
+        начале файла), положительный нужно подтверждать через
+        get_compression_info, так как байты могли совпасть случайно.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                header = f.read(ExifHandler._HEADER_READ_SIZE)
+        except OSError:
+            return False
+        return ExifHandler._MARKER_BYTES in header
+
+    @staticmethod
+    def check_status(
+        file_path: str, stat_result: Optional[os.stat_result] = None
+    ) -> Tuple[bool, bool]:
+        """
+        Объединённая проверка статуса файла за один разбор EXIF.
+
+        Вместо пары вызовов is_image_compressed + should_recompress (два
+        открытия файла и два парсинга одного и того же EXIF) возвращает оба
+        ответа из одного чтения маркера.
+
+        Args:
+            stat_result: Готовый os.stat вызывающего (см. get_compression_info)
+
+        Returns:
+            Кортеж (is_compressed, should_recompress)
+        """
+        is_compressed, _, _ = ExifHandler.get_compression_info(file_path, stat_result)
+        return is_compressed, not is_compressed
+
     @staticmethod
     def add_compression_marker(file_path: str, quality: int, source_exif: Optional[dict] = None) -> bool:
         """
@@ -130,18 +285,15 @@ class ExifHandler:
         """
         try:
             if source_exif:
-                # Copy all metadata from source and add marker
-                exif_dict = {}
-                for ifd_name in ["0th", "Exif", "1st", "GPS", "Interop"]:
-                    if ifd_name in source_exif and source_exif[ifd_name]:
-                        exif_dict[ifd_name] = {}
-                        for tag, value in source_exif[ifd_name].items():
-                            exif_dict[ifd_name][tag] = value
-
-                if "Exif" not in exif_dict:
-                    exif_dict["Exif"] = {}
-
-                timestamp = int(datetime.now().timestamp() * 1000)
+                # Переносим метаданные без поэлементного копирования: piexif.dump
+                # только читает словарь, поэтому достаточно разделить ссылки
+                # на IFD-секции и скопировать лишь мутируемую секцию "Exif"
+                exif_dict = {
+                    k: v for k, v in source_exif.items() if k in _IFD_NAMES and v
+                }
+                exif_dict["Exif"] = dict(exif_dict.get("Exif", {}))
+
+                timestamp = time.time_ns() // 1_000_000
                 marker_data = f"{EXIF_COMPRESSION_MARKER}:{quality}:{timestamp}"
                 marker_bytes = marker_data.encode("utf-8")
 
@@ -154,6 +306,7 @@ class ExifHandler:
                     return False
 
                 piexif.insert(exif_bytes, file_path)
+                ExifHandler._get_compression_info_cached.cache_clear()
                 return True
             else:
                 # Read existing EXIF data
@@ -171,7 +324,7 @@ class ExifHandler:
                 if "Exif" not in exif_dict:
                     exif_dict["Exif"] = {}
 
-                timestamp = int(datetime.now().timestamp() * 1000)
+                timestamp = time.time_ns() // 1_000_000
                 marker_data = f"{EXIF_COMPRESSION_MARKER}:{quality}:{timestamp}"
                 marker_bytes = marker_data.encode("utf-8")
 
@@ -190,11 +343,49 @@ class ExifHandler:
                     except Exception:
                         return False
 
-                piexif.insert(exif_bytes, file_path)
+                # Файл уже прочитан выше — отдаём piexif.insert готовый буфер,
+                # чтобы он не читал тот же JPEG с диска второй раз
+                piexif.insert(exif_bytes, exif_data, file_path)
+                ExifHandler._get_compression_info_cached.cache_clear()
                 return True
         except Exception:
             return False
 
+    @staticmethod
+    def apply_markers_batch(jobs: List[Tuple[str, int]]) -> List[bool]:
+        """
+        Проставляет маркер сжатия сразу для пакета файлов в пуле процессов.
+
+        Перезапись APP1-сегмента — независимая по файлам CPU/IO-операция,
+        поэтому пакет масштабируется почти линейно по ядрам. Маленькие
+        пакеты обрабатываются в текущем процессе: старт пула дороже работы.
+
+        Args:
+            jobs: Список пар (путь к файлу, качество сжатия)
+
+        Returns:
+            Список результатов add_compression_marker в порядке jobs
+        """
+        if not jobs:
+            return []
+
+        num_workers = min(os.cpu_count() or 1, len(jobs))
+        if num_workers <= 1 or len(jobs) < 4:
+            return [ExifHandler.add_compression_marker(p, q) for p, q in jobs]
+
+        chunksize = max(1, len(jobs) // (num_workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor:
+            results = list(
+                executor.map(_apply_marker_job, jobs, chunksize=chunksize)
+            )
+
+        # Воркеры писали в файлы в своих процессах — локальный кэш устарел
+        ExifHandler._get_compression_info_cached.cache_clear()
+        return results
+
     @staticmethod
     def copy_exif_data(source_path: str, target_path: str) -> bool:
         try:
@@ -202,27 +393,37 @@ class ExifHandler:
             if source_exif is None:
                 return False
 
-            target_exif = {}
-            for ifd_name in ["0th", "Exif", "1st", "GPS", "Interop"]:
-                if ifd_name in source_exif and source_exif[ifd_name]:
-                    target_exif[ifd_name] = {}
-                    for tag, value in source_exif[ifd_name].items():
-                        target_exif[ifd_name][tag] = value
+            # Словарь не мутируется дальше — передаём IFD-секции по ссылке
+            target_exif = {
+                k: v for k, v in source_exif.items() if k in _IFD_NAMES and v
+            }
 
             if not target_exif:
                 return False
 
             exif_bytes = piexif.dump(target_exif)
 
+            # Для JPEG достаточно переписать APP1-сегмент на месте — без
+            # декодирования и повторного кодирования пикселей; формат
+            # определяем по расширению, чтобы не открывать файл через PIL
+            if target_path.lower().endswith((".jpg", ".jpeg")):
+                try:
+                    piexif.insert(exif_bytes, target_path)
+                    return True
+                except Exception:
+                    pass
+
+            # Резервный путь только переносит метаданные — optimize=True
+            # добавлял бы лишний проход оптимизации Хаффмана по всему файлу
             with Image.open(target_path) as img:
                 fmt = img.format or "JPEG"
                 if fmt.lower() == "jpeg":
                     try:
-                        img.save(target_path, exif=exif_bytes, optimize=True)
+                        img.save(target_path, exif=exif_bytes)
                     except Exception:
-                        img.save(target_path, optimize=True)
+                        img.save(target_path)
                 elif fmt.lower() == "png":
-                    img.save(target_path, optimize=True)
+                    img.save(target_path)
 
             return True
         except Exception:
@@ -249,50 +450,39 @@ class ExifHandler:
             if source_exif is None or not source_exif:
                 return ExifHandler.add_compression_marker(target_path, quality)
 
-            target_exif = {}
-            for ifd_name in ["0th", "Exif", "1st", "GPS", "Interop"]:
-                if ifd_name in source_exif and source_exif[ifd_name]:
-                    target_exif[ifd_name] = {}
-                    for tag, value in source_exif[ifd_name].items():
-                        target_exif[ifd_name][tag] = value
-
-            if "Exif" not in target_exif:
-                target_exif["Exif"] = {}
-
-            timestamp = int(datetime.now().timestamp() * 1000)
+            timestamp = time.time_ns() // 1_000_000
             marker_data = f"{EXIF_COMPRESSION_MARKER}:{quality}:{timestamp}"
             marker_bytes = marker_data.encode("utf-8")
 
-            target_exif["Exif"][piexif.ExifIFD.UserComment] = marker_bytes
+            # Словарь только что прочитан и никому больше не принадлежит —
+            # ставим маркер прямо в него, без промежуточных копий секций
+            source_exif.setdefault("Exif", {})[piexif.ExifIFD.UserComment] = marker_bytes
 
             exif_bytes = None
             try:
-                exif_bytes = piexif.dump(target_exif)
+                exif_bytes = piexif.dump(source_exif)
+            except Exception:
+                # Чаще всего dump падает на миниатюре — повторяем без неё
+                source_exif.pop("thumbnail", None)
+                source_exif.pop("1st", None)
+                try:
+                    exif_bytes = piexif.dump(source_exif)
+                except Exception:
+                    if fallback_on_error:
+                        return ExifHandler.add_compression_marker(target_path, quality, source_exif)
+                    return False
+
+            # piexif.insert переписывает только APP1-сегмент на месте — без
+            # декодирования и повторного JPEG-кодирования пикселей, которое
+            # здесь делал Image.open + img.save(quality=...)
+            try:
+                piexif.insert(exif_bytes, target_path)
             except Exception:
                 if fallback_on_error:
                     return ExifHandler.add_compression_marker(target_path, quality, source_exif)
                 return False
 
-            with Image.open(target_path) as img:
-                fmt = img.format or "JPEG"
-                if fmt.lower() == "jpeg":
-                    try:
-                        if exif_bytes:
-                            img.save(
-                                target_path,
-                                exif=exif_bytes,
-                                quality=quality,
-                                optimize=True,
-                            )
-                        else:
-                            img.save(target_path, quality=quality, optimize=True)
-                    except Exception:
-                        if fallback_on_error:
-                            return ExifHandler.add_compression_marker(target_path, quality, source_exif)
-                        return False
-                elif fmt.lower() == "png":
-                    img.save(target_path, optimize=True)
-
+            ExifHandler._get_compression_info_cached.cache_clear()
             return True
         except Exception:
             if fallback_on_error:
@@ -336,56 +526,25 @@ class ExifHandler:
 
         result = {}
 
-        # Key tags to validate
-        key_tags = {
-            "0th": ["Make", "Model", "Software", "Orientation"],
-            "Exif": [
-                "DateTimeOriginal",
-                "DateTime",
-                "DateTimeDigitized",
-                "ExposureTime",
-                "ExposureBiasValue",
-                "FNumber",
-                "FocalLength",
-                "FocalLengthIn35mmFilm",
-                "PhotographicSensitivity",
-                "ISOSpeedRatings",
-            ],
-            "GPS": [
-                "GPSLatitude",
-                "GPSLatitudeRef",
-                "GPSLongitude",
-                "GPSLongitudeRef",
-                "GPSAltitude",
-            ],
-        }
-
-        for ifd_name, tag_names in key_tags.items():
-            for tag_name in tag_names:
-                source_present = False
-                target_present = False
-                values_equal = False
-
-                # Check source
-                if source_exif and ifd_name in source_exif:
-                    source_value = source_exif[ifd_name].get(tag_name)
-                    if source_value is not None:
-                        source_present = True
-
-                # Check target
-                if target_exif and ifd_name in target_exif:
-                    target_value = target_exif[ifd_name].get(tag_name)
-                    if target_value is not None:
-                        target_present = True
-
-                # Compare values if both present
-                if source_present and target_present:
-                    try:
-                        values_equal = source_exif[ifd_name][tag_name] == target_exif[ifd_name][tag_name]
-                    except Exception:
-                        values_equal = False
+        for ifd_name, tag_ids in _KEY_TAG_IDS.items():
+            sdict = source_exif.get(ifd_name) or {} if source_exif else {}
+            tdict = target_exif.get(ifd_name) or {} if target_exif else {}
+
+            # Пересечения множеств вместо поэлементных проверок наличия тегов
+            source_keys = tag_ids.keys() & sdict.keys()
+            target_keys = tag_ids.keys() & tdict.keys()
+            both = source_keys & target_keys
 
-                result[tag_name] = (source_present, target_present, values_equal)
+            for tag_id, tag_name in tag_ids.items():
+                result[tag_name] = (
+                    tag_id in source_keys,
+                    tag_id in target_keys,
+                    tag_id in both and sdict[tag_id] == tdict[tag_id],
+                )
 
         return result
 
+def _apply_marker_job(job: Tuple[str, int]) -> bool:
+    """Воркер пула: распаковывает (путь, качество) для executor.map."""
+    file_path, quality = job
+    return ExifHandler.add_compression_marker(file_path, quality)
@@ -1,5 +1,7 @@
+import concurrent.futures
+import functools
 import os
-from pathlib import Path
+import re
 from typing import List, Tuple, Optional
 
 from .constants import (
@@ -12,28 +14,51 @@ from .constants import (
 )
 
 
+# Замороженные копии констант для горячего цикла сканирования: frozenset
+# гарантирует O(1)-проверку расширения, а путь каталога приложения с
+# разделителями не совпадает со случайными именами вида "MyCompressPhotoFast"
+_SUPPORTED_EXT_SET = frozenset(SUPPORTED_EXTENSIONS)
+_APP_DIR_SEP = os.sep + APP_DIRECTORY + os.sep
+
+
 class FileInfo:
+    # Фиксированный набор атрибутов: без __dict__ экземпляр занимает заметно
+    # меньше памяти, что важно при сканировании десятков тысяч файлов
+    __slots__ = ("path", "name", "size", "mtime", "is_supported", "extension")
+
     def __init__(
-        self, path: str, name: str, size: int, mtime: float, is_supported: bool = True
+        self,
+        path: str,
+        name: str,
+        size: int,
+        mtime: float,
+        is_supported: bool = True,
+        extension: Optional[str] = None,
     ):
         self.path = path
         self.name = name
         self.size = size
         self.mtime = mtime
         self.is_supported = is_supported
-        self.extension = os.path.splitext(name)[1].lower()
+        # Сканер уже вычислил расширение для фильтра — не разбираем имя заново
+        if extension is None:
+            extension = os.path.splitext(name)[1].lower()
+        self.extension = extension
 
 
 def is_valid_file_size(size: int) -> bool:
     return MIN_FILE_SIZE <= size <= MAX_FILE_SIZE
 
 
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def format_size(size: int) -> str:
-    for unit in ["B", "KB", "MB", "GB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
+    if size < 1024:
+        return f"{size:.1f} B"
+    # Порядок величины напрямую из длины числа в битах — без цикла делений
+    exp = min((int(size).bit_length() - 1) // 10, 4)
+    return f"{size / (1 << (exp * 10)):.1f} {_SIZE_UNITS[exp]}"
 
 
 def format_duration(seconds: float) -> str:
@@ -53,39 +78,113 @@ def format_duration(seconds: float) -> str:
     """
     if seconds < 60:
         return f"{seconds:.1f}s"
-    elif seconds < 3600:
-        minutes = int(seconds // 60)
-        secs = seconds % 60
-        return f"{minutes}m {secs:.0f}s"
-    else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hours}h {minutes}m {secs:.0f}s"
+
+    minutes, secs = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{int(minutes)}m {secs:.0f}s"
+
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}h {minutes}m {secs:.0f}s"
+
+
+# Предкомпилированные шаблоны: один проход регулярного выражения вместо
+# .lower() + нескольких подстрочных поисков на каждый файл при сканировании
+_SCREENSHOT_RE = re.compile(r"^scr_|screen.*?shot|shot.*?screen", re.IGNORECASE)
+# Все подстроки классификации пути в одном автомате: /documents/ исключает
+# файл, остальные группы помечают его как мессенджерный — один проход по
+# строке вместо отдельных поисков на каждый шаблон
+# (закрывающий слэш проверяется lookahead-ом, чтобы совпадения вида
+# /whatsapp/documents/ не перекрывали друг друга общим разделителем)
+_MESSENGER_PATH_RE = re.compile(
+    r"(?P<doc>/documents(?=/))"
+    r"|/(?:whatsapp|telegram|viber|messenger|messages)(?=/)"
+    r"|pictures/messages",
+    re.IGNORECASE,
+)
 
 
 def is_screenshot(filename: str) -> bool:
-    name_lower = filename.lower()
-    return (
-        "screenshot" in name_lower
-        or "screen_shot" in name_lower
-        or name_lower.startswith("scr_")
-        or ("screen" in name_lower and "shot" in name_lower)
-    )
+    return _SCREENSHOT_RE.search(filename) is not None
 
 
 def is_messenger_photo(path: str) -> bool:
-    path_lower = path.lower()
-    if "/documents/" in path_lower:
-        return False
-    return (
-        "/whatsapp/" in path_lower
-        or "/telegram/" in path_lower
-        or "/viber/" in path_lower
-        or "/messenger/" in path_lower
-        or "/messages/" in path_lower
-        or "pictures/messages" in path_lower
-    )
+    is_messenger = False
+    for match in _MESSENGER_PATH_RE.finditer(path):
+        if match.lastgroup == "doc":
+            return False
+        is_messenger = True
+    return is_messenger
+
+
+# Потоки сканирования: scandir/stat отпускают GIL на время syscall, поэтому
+# параллельный обход каталогов ускоряет именно метаданные — особенно на
+# сетевых ФС, где каждая операция стоит round-trip
+_SCAN_THREADS = 16
+
+
+def _scan_directory(
+    directory: str,
+    skip_screenshots: bool,
+    skip_messenger: bool,
+    skip_app_dir: bool,
+) -> Tuple[List[FileInfo], List[str]]:
+    """Сканирует один каталог: возвращает (файлы, подкаталоги)."""
+    files = []
+    subdirs = []
+
+    # Локальные привязки для самого горячего цикла CLI: поиск в локальных
+    # переменных дешевле обращения к глобалам/атрибутам на каждый файл
+    supported = _SUPPORTED_EXT_SET
+    app_dir = _APP_DIR_SEP
+    check_messenger = is_messenger_photo
+    check_screenshot = is_screenshot
+    make_info = FileInfo
+    append_file = files.append
+    append_dir = subdirs.append
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    file_path = entry.path
+
+                    if skip_app_dir:
+                        if app_dir in file_path:
+                            continue
+
+                    if skip_messenger and check_messenger(file_path):
+                        continue
+
+                    filename = entry.name
+                    if skip_screenshots and check_screenshot(filename):
+                        continue
+
+                    ext = "." + filename.rpartition(".")[2].lower()
+                    if ext not in supported:
+                        continue
+
+                    try:
+                        # DirEntry.stat() берёт данные из результата scandir,
+                        # где ОС их уже отдала — без отдельного syscall
+                        stat = entry.stat()
+                        append_file(
+                            make_info(
+                                file_path,
+                                filename,
+                                stat.st_size,
+                                stat.st_mtime,
+                                extension=ext,
+                            )
+                        )
+                    except OSError:
+                        continue
+                elif entry.is_dir(follow_symlinks=False):
+                    append_dir(entry.path)
+    except (OSError, PermissionError):
+        # Skip directories we can't access
+        pass
+
+    return files, subdirs
 
 
 def find_image_files(
@@ -95,69 +194,75 @@ def find_image_files(
     skip_messenger: bool = False,
     skip_app_dir: bool = True,
 ) -> List[FileInfo]:
-    root = Path(root_path)
-    if not root.exists():
+    if not os.path.exists(root_path):
         return []
 
     files = []
 
-    def scan_directory(directory: Path):
-        """Scan a single directory using os.scandir for better performance."""
-        try:
-            with os.scandir(directory) as entries:
-                for entry in entries:
-                    if entry.is_file():
-                        file_path = entry.path
-
-                        if skip_app_dir:
-                            if APP_DIRECTORY in file_path:
-                                continue
+    # Пул потоков сканирует каталоги параллельно: каждый поток обходит свой
+    # подкаталог, главный поток досылает найденные подкаталоги в работу по
+    # мере завершения задач
+    with concurrent.futures.ThreadPoolExecutor(max_workers=_SCAN_THREADS) as pool:
+        pending = {
+            pool.submit(
+                _scan_directory,
+                root_path,
+                skip_screenshots,
+                skip_messenger,
+                skip_app_dir,
+            )
+        }
+
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                dir_files, subdirs = future.result()
+                files.extend(dir_files)
+                if recursive:
+                    for subdir in subdirs:
+                        pending.add(
+                            pool.submit(
+                                _scan_directory,
+                                subdir,
+                                skip_screenshots,
+                                skip_messenger,
+                                skip_app_dir,
+                            )
+                        )
 
-                        if skip_messenger and is_messenger_photo(file_path):
-                            continue
+    return files
 
-                        filename = entry.name
-                        if skip_screenshots and is_screenshot(filename):
-                            continue
 
-                        ext = os.path.splitext(filename)[1].lower()
-                        if ext not in SUPPORTED_EXTENSIONS:
-                            continue
+@functools.lru_cache(maxsize=32)
+def _list_compressed_dir(compressed_dir: str) -> Tuple[str, ...]:
+    """Однократное чтение каталога сжатых копий; кэш на повторные запросы."""
+    try:
+        with os.scandir(compressed_dir) as entries:
+            return tuple(e.name for e in entries if e.is_file())
+    except OSError:
+        return ()
 
-                        try:
-                            stat = entry.stat()
-                            files.append(FileInfo(file_path, filename, stat.st_size, stat.st_mtime))
-                        except OSError:
-                            continue
-                    elif recursive and entry.is_dir():
-                        # Recursively scan subdirectories
-                        scan_directory(Path(entry.path))
-        except (OSError, PermissionError):
-            # Skip directories we can't access
-            pass
 
-    scan_directory(root)
-    return files
+def invalidate_compressed_dir_cache() -> None:
+    """Сбрасывает кэш листинга после записи новых файлов в каталог приложения."""
+    _list_compressed_dir.cache_clear()
 
 
 def find_compressed_versions(root_path: str, original_name: str) -> List[str]:
-    root = Path(root_path)
-    compressed_dir = root / APP_DIRECTORY
-
-    if not compressed_dir.exists():
-        return []
-
-    base_name = os.path.splitext(original_name)[0]
-    ext = os.path.splitext(original_name)[1]
-
-    pattern = f"{base_name}{COMPRESSED_FILE_SUFFIX}*{ext}"
-    compressed_files = []
+    compressed_dir = os.path.join(root_path, APP_DIRECTORY)
 
-    for item in compressed_dir.glob(pattern):
-        if item.is_file():
-            compressed_files.append(str(item))
+    base_name, ext = os.path.splitext(original_name)
+    prefix = base_name + COMPRESSED_FILE_SUFFIX
 
-    return compressed_files
+    # Один проход по кэшированному листингу вместо glob с fnmatch на каждую
+    # запись: O(N+M) при проверке N оригиналов против M сжатых копий
+    return [
+        os.path.join(compressed_dir, name)
+        for name in _list_compressed_dir(compressed_dir)
+        if name.startswith(prefix) and name.endswith(ext)
+    ]
 
 
 def create_compressed_filename(original_name: str, replace_mode: bool = False) -> str:
@@ -209,15 +314,14 @@ def get_total_folder_size(root_path: str, recursive: bool = True) -> int:
     Returns:
         Total size in bytes
     """
-    root = Path(root_path)
-    if not root.exists() or not root.is_dir():
+    if not os.path.isdir(root_path):
         return 0
 
     total_size = 0
+    stack = [root_path]
 
-    def scan_directory(directory: Path):
-        """Scan a single directory using os.scandir for better performance."""
-        nonlocal total_size
+    while stack:
+        directory = stack.pop()
         try:
             with os.scandir(directory) as entries:
                 for entry in entries:
@@ -226,12 +330,10 @@ def get_total_folder_size(root_path: str, recursive: bool = True) -> int:
                             total_size += entry.stat().st_size
                         except OSError:
                             continue
-                    elif recursive and entry.is_dir():
-                        # Recursively scan subdirectories
-                        scan_directory(Path(entry.path))
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
         except (OSError, PermissionError):
             # Skip directories we can't access
-            pass
+            continue
 
-    scan_directory(root)
     return total_size
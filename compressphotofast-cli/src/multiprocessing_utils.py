@@ -1,23 +1,130 @@
 """
 Multiprocessing utilities for parallel image compression.
 
-Provides process-safe wrapper for statistics collection and worker function
-for processing individual images in multi-process environment.
+Provides worker functions for processing individual images in a
+multi-process environment plus the enum codes they send back.
 """
 
+import os
+from enum import IntEnum
 from typing import Tuple, Optional
-from traceback import format_exc
+from traceback import format_exc, format_exception_only
 
 from .compression import ImageCompressor, CompressionResult
 from .exif_handler import ExifHandler
 from .file_utils import FileInfo, is_already_small
 
 
+class SkipReason(IntEnum):
+    """
+    Коды причин пропуска файла, возвращаемые воркерами.
+
+    Через границу процессов уходит маленький int вместо готовой строки:
+    pickle-стоимость результата не зависит от текста, а человекочитаемые
+    подписи собирает главный процесс через format_skip_reason.
+    """
+
+    NONE = 0
+    ALREADY_COMPRESSED = 1
+    ALREADY_SMALL = 2
+    NOT_EFFICIENT = 3
+    TEST_FAILED = 4
+    CHECK_ERROR = 5
+    TEST_ERROR = 6
+    INTERRUPTED = 7
+    WORKER_ERROR = 8
+
+
+class ErrorKind(IntEnum):
+    """
+    Коды ошибок воркера — вместо готовых f-строк с префиксами.
+
+    Детали ошибки (str(e)) всё равно нужны пользователю, но сам префикс
+    вида "Compression error: " больше не аллоцируется и не пиклится на
+    каждый сбой: через IPC уходит (код, детали), подпись собирает
+    главный процесс по статической таблице.
+    """
+
+    NONE = 0
+    COMPRESSION = 1
+    INTERRUPTED = 2
+    WORKER = 3
+
+
+_ERROR_KIND_LABELS = {
+    ErrorKind.NONE: "",
+    ErrorKind.COMPRESSION: "Compression error",
+    ErrorKind.INTERRUPTED: "Interrupted",
+    ErrorKind.WORKER: "Worker error",
+}
+
+
+# Общий кортеж счастливого пути: одна ссылка вместо новой пары на файл
+_NO_ERROR = (ErrorKind.NONE, "")
+
+
+def format_error(kind: ErrorKind, detail: str = "") -> str:
+    """Собирает подпись ошибки воркера в главном процессе."""
+    label = _ERROR_KIND_LABELS[kind]
+    if detail:
+        return f"{label}: {detail}" if label else detail
+    return label
+
+
+_SKIP_REASON_LABELS = {
+    SkipReason.NONE: "",
+    SkipReason.ALREADY_COMPRESSED: "Already compressed",
+    SkipReason.ALREADY_SMALL: "Already small",
+    SkipReason.NOT_EFFICIENT: "Compression not efficient",
+    SkipReason.TEST_FAILED: "Test failed",
+    SkipReason.CHECK_ERROR: "Check error",
+    SkipReason.TEST_ERROR: "Test error",
+    SkipReason.INTERRUPTED: "Interrupted",
+    SkipReason.WORKER_ERROR: "Worker error",
+}
+
+
+def init_worker() -> None:
+    """
+    Инициализатор процесса-воркера: прогревает импорты до первой задачи.
+
+    При spawn-старте каждый воркер платит за импорт C-расширений Pillow и
+    регистрацию плагинов на первом же файле. Выносим это в initializer
+    пула, чтобы первая задача обрабатывалась с той же скоростью, что и
+    сотая.
+    """
+    from PIL import Image
+
+    # Заполняет реестр плагинов Pillow (JPEG/PNG/HEIF и т.д.) заранее
+    Image.init()
+
+
+def _format_worker_error(e: BaseException) -> str:
+    """
+    Краткое описание ошибки воркера для передачи в главный процесс.
+
+    Полный traceback через format_exc строится и пиклится на каждый сбой —
+    на «плохой» папке это килобайты на файл. По умолчанию отдаём одну
+    строку format_exception_only; полный стек включается CPF_DEBUG=1.
+    """
+    if os.environ.get("CPF_DEBUG") == "1":
+        return format_exc()
+    return "".join(format_exception_only(type(e), e)).strip()
+
+
+def format_skip_reason(reason: SkipReason, detail: str = "") -> str:
+    """Собирает подпись причины пропуска в главном процессе."""
+    label = _SKIP_REASON_LABELS[reason]
+    if detail:
+        return f"{label}: {detail}" if label else detail
+    return label
+
+
 def process_single_file_dry_run(
     file_info: FileInfo,
     quality: int,
     force: bool
-) -> Tuple[FileInfo, bool, str, Optional[CompressionResult]]:
+) -> Tuple[str, bool, SkipReason, str, Optional[CompressionResult]]:
     """
     Worker function to analyze a single image file in dry-run mode.
 
@@ -33,29 +140,45 @@ def process_single_file_dry_run(
 
     Returns:
         Tuple containing:
-        - file_info: Original file information
+        - path: Path of the analyzed file (parent looks up its FileInfo)
         - should_process: Whether the file should be compressed
-        - skip_reason: Reason for skipping (empty string if not skipped)
+        - skip_reason: SkipReason code (NONE if not skipped)
+        - skip_detail: Extra text for error reasons (empty otherwise)
         - test_result: CompressionResult from test_compression (None if skipped/error)
     """
+    # Обратно уходит только путь: FileInfo главный процесс и так знает,
+    # гонять его через pickle в обе стороны — чистый налог на IPC
+    path = file_info.path
+
     try:
         should_process = True
-        skip_reason = ""
+        skip_reason = SkipReason.NONE
+        skip_detail = ""
         test_result = None
 
         # Check if processing is needed
         if not force:
             try:
-                if (ExifHandler.is_image_compressed(file_info.path) and
-                    not ExifHandler.should_recompress(file_info.path)):
+                # Сначала дешёвое сравнение размера (число уже в FileInfo),
+                # и только потом разбор EXIF-маркера, требующий чтения файла
+                if is_already_small(file_info.size):
                     should_process = False
-                    skip_reason = "Already compressed"
-                elif is_already_small(file_info.size):
-                    should_process = False
-                    skip_reason = "Already small"
+                    skip_reason = SkipReason.ALREADY_SMALL
+                else:
+                    # Один os.stat в воркере: результат уходит в check_status,
+                    # чтобы ExifHandler не статил файл повторно для ключа кэша
+                    st = os.stat(path)
+                    # Слитый API: один разбор EXIF отдаёт оба предиката
+                    is_compressed, recompress = ExifHandler.check_status(
+                        path, stat_result=st
+                    )
+                    if is_compressed and not recompress:
+                        should_process = False
+                        skip_reason = SkipReason.ALREADY_COMPRESSED
             except Exception as e:
                 # Error during checking - log but try to process anyway
-                skip_reason = f"Check error: {str(e)}"
+                skip_reason = SkipReason.CHECK_ERROR
+                skip_detail = str(e)
 
         # Test compression if needed
         if should_process:
@@ -63,196 +186,52 @@ def process_single_file_dry_run(
                 test_result = ImageCompressor.test_compression(file_info.path, quality)
                 if test_result and not test_result.is_efficient:
                     should_process = False
-                    skip_reason = "Compression not efficient"
+                    skip_reason = SkipReason.NOT_EFFICIENT
+                    skip_detail = ""
                     # NOTE: In dry-run mode, we don't add markers to files
                 elif not test_result:
                     should_process = False
-                    skip_reason = "Test failed"
+                    skip_reason = SkipReason.TEST_FAILED
+                    skip_detail = ""
             except Exception as e:
                 # Error during test compression
                 return (
-                    file_info,
+                    path,
                     False,
-                    f"Test error: {type(e).__name__}: {str(e)}",
+                    SkipReason.TEST_ERROR,
+                    f"{type(e).__name__}: {str(e)}",
                     None
                 )
 
-        return (file_info, should_process, skip_reason, test_result)
+        return (path, should_process, skip_reason, skip_detail, test_result)
 
     except KeyboardInterrupt:
         # Worker interrupted - return gracefully
         return (
-            file_info,
+            path,
             False,
-            "Interrupted",
+            SkipReason.INTERRUPTED,
+            "",
             None
         )
     except Exception as e:
         # Unexpected error in worker function
-        error_msg = f"Worker error: {type(e).__name__}: {str(e)}\n{format_exc()}"
         return (
-            file_info,
+            path,
             False,
-            error_msg,
+            SkipReason.WORKER_ERROR,
+            _format_worker_error(e),
             None
         )
 
 
-class ProcessSafeStats:
-    """
-    Process-safe wrapper around CompressionStats.
-
-    Uses multiprocessing.Manager().Lock to ensure safe concurrent access to statistics
-    from multiple worker processes.
-
-    All methods that modify state are protected by locks.
-    """
-
-    def __init__(self, manager_lock=None):
-        """
-        Initialize process-safe statistics wrapper.
-
-        Args:
-            manager_lock: Optional lock from multiprocessing.Manager().Lock()
-                          If None, creates a new lock (not recommended for multiprocessing)
-        """
-        from .stats import CompressionStats
-        self._stats = CompressionStats()
-        self._lock = manager_lock
-
-    def add_result(
-        self,
-        result: CompressionResult,
-        skipped: bool = False,
-        reason: str = ""
-    ) -> None:
-        """
-        Process-safe addition of compression result.
-
-        Args:
-            result: Compression result to add
-            skipped: Whether the file was skipped
-            reason: Reason for skipping (if applicable)
-        """
-        if self._lock:
-            with self._lock:
-                self._stats.add_result(result, skipped, reason)
-        else:
-            # Fallback for single-process mode
-            self._stats.add_result(result, skipped, reason)
-
-    def print_summary(self) -> None:
-        """Print summary statistics (called from main process only)."""
-        # No lock needed - called from main process after all workers complete
-        self._stats.print_summary()
-
-    def start_timing(self) -> None:
-        """Начать отсчет времени (только в главном процессе)."""
-        self._stats.start_timing()
-
-    def stop_timing(self) -> None:
-        """Остановить отсчет времени (только в главном процессе)."""
-        self._stats.stop_timing()
-
-    @property
-    def total(self) -> int:
-        """Get total number of files."""
-        return self._stats.total
-
-    @total.setter
-    def total(self, value: int) -> None:
-        """Set total number of files (called from main process only)."""
-        self._stats.total = value
-
-    @property
-    def success(self) -> int:
-        """Get number of successful compressions."""
-        return self._stats.success
-
-    @property
-    def processed(self) -> int:
-        """Get number of processed files."""
-        return self._stats.processed
-
-    @property
-    def original_size_total(self) -> int:
-        """Get total original size."""
-        return self._stats.original_size_total
-
-    @property
-    def compressed_size_total(self) -> int:
-        """Get total compressed size."""
-        return self._stats.compressed_size_total
-
-    @property
-    def processed_path(self) -> str:
-        """Get processed path."""
-        return self._stats.processed_path
-
-    @processed_path.setter
-    def processed_path(self, value: str) -> None:
-        """Set processed path (called from main process only)."""
-        self._stats.processed_path = value
-
-    @property
-    def folder_size_before(self) -> int:
-        """Get folder size before compression."""
-        return self._stats.folder_size_before
-
-    @folder_size_before.setter
-    def folder_size_before(self, value: int) -> None:
-        """Set folder size before compression."""
-        self._stats.folder_size_before = value
-
-    @property
-    def folder_size_after(self) -> int:
-        """Get folder size after compression."""
-        return self._stats.folder_size_after
-
-    @folder_size_after.setter
-    def folder_size_after(self, value: int) -> None:
-        """Set folder size after compression."""
-        self._stats.folder_size_after = value
-
-    @property
-    def total_folder_size_before(self) -> int:
-        """Get total folder size before compression (all files)."""
-        return self._stats.total_folder_size_before
-
-    @total_folder_size_before.setter
-    def total_folder_size_before(self, value: int) -> None:
-        """Set total folder size before compression (called from main process only)."""
-        self._stats.total_folder_size_before = value
-
-    @property
-    def total_folder_size_after(self) -> int:
-        """Get total folder size after compression (all files)."""
-        return self._stats.total_folder_size_after
-
-    @total_folder_size_after.setter
-    def total_folder_size_after(self, value: int) -> None:
-        """Set total folder size after compression (called from main process only)."""
-        self._stats.total_folder_size_after = value
-
-    @property
-    def metadata_preserved_count(self) -> int:
-        """Get count of files with preserved metadata."""
-        return self._stats.metadata_preserved_count
-
-    @property
-    def metadata_lost_count(self) -> int:
-        """Get count of files with lost metadata."""
-        return self._stats.metadata_lost_count
-
-
-
 def process_single_file(
     file_info: FileInfo,
     quality: int,
     replace: bool,
     output_dir: Optional[str],
     force: bool
-) -> Tuple[FileInfo, Optional[CompressionResult], bool, str, str]:
+) -> Tuple[str, Optional[CompressionResult], bool, SkipReason, Tuple[ErrorKind, str]]:
     """
     Worker function to process a single image file.
 
@@ -271,29 +250,41 @@ def process_single_file(
 
     Returns:
         Tuple containing:
-        - file_info: Original file information
+        - path: Path of the processed file (parent looks up its FileInfo)
         - result: CompressionResult (None if skipped)
         - skipped: Whether the file was skipped
-        - skip_reason: Reason for skipping (empty string if not skipped)
-        - error_message: Error message if exception occurred (empty if no error)
+        - skip_reason: SkipReason code (NONE if not skipped)
+        - error: Tuple (ErrorKind, detail); (ErrorKind.NONE, "") if no error
     """
+    # См. process_single_file_dry_run: в ответ уходит путь вместо FileInfo
+    path = file_info.path
+
     try:
         # Check if processing is needed
         should_process = True
-        skip_reason = ""
+        skip_reason = SkipReason.NONE
 
         if not force:
             try:
-                if (ExifHandler.is_image_compressed(file_info.path) and
-                    not ExifHandler.should_recompress(file_info.path)):
+                # Сначала дешёвое сравнение размера (число уже в FileInfo),
+                # и только потом разбор EXIF-маркера, требующий чтения файла
+                if is_already_small(file_info.size):
                     should_process = False
-                    skip_reason = "Already compressed"
-                elif is_already_small(file_info.size):
-                    should_process = False
-                    skip_reason = "Already small"
+                    skip_reason = SkipReason.ALREADY_SMALL
+                else:
+                    # Один os.stat в воркере: результат уходит в check_status,
+                    # чтобы ExifHandler не статил файл повторно для ключа кэша
+                    st = os.stat(path)
+                    # Слитый API: один разбор EXIF отдаёт оба предиката
+                    is_compressed, recompress = ExifHandler.check_status(
+                        path, stat_result=st
+                    )
+                    if is_compressed and not recompress:
+                        should_process = False
+                        skip_reason = SkipReason.ALREADY_COMPRESSED
             except Exception as e:
                 # Error during checking - log but try to process anyway
-                skip_reason = f"Check error: {str(e)}"
+                skip_reason = SkipReason.CHECK_ERROR
 
         # Process the file if needed
         if should_process:
@@ -306,7 +297,6 @@ def process_single_file(
                     except Exception as e:
                         # If quality detection fails, use default
                         actual_quality = 75  # Default fallback
-                        skip_reason = f"Quality detection failed: {str(e)}"
 
                 # Compress the image
                 result = ImageCompressor.compress_image_safe(
@@ -316,44 +306,42 @@ def process_single_file(
                     output_dir=output_dir
                 )
 
-                return (file_info, result, False, "", "")
+                return (path, result, False, SkipReason.NONE, _NO_ERROR)
 
             except Exception as e:
                 # Error during compression
-                error_msg = f"Compression error: {type(e).__name__}: {str(e)}"
                 return (
-                    file_info,
+                    path,
                     None,
                     False,
-                    "",
-                    error_msg
+                    SkipReason.NONE,
+                    (ErrorKind.COMPRESSION, f"{type(e).__name__}: {str(e)}")
                 )
         else:
             # File was skipped
             return (
-                file_info,
+                path,
                 None,
                 True,
                 skip_reason,
-                ""
+                _NO_ERROR
             )
 
     except KeyboardInterrupt:
         # Worker interrupted - return gracefully
         return (
-            file_info,
+            path,
             None,
             False,
-            "",
-            "Interrupted"
+            SkipReason.NONE,
+            (ErrorKind.INTERRUPTED, "")
         )
     except Exception as e:
         # Unexpected error in worker function
-        error_msg = f"Worker error: {type(e).__name__}: {str(e)}\n{format_exc()}"
         return (
-            file_info,
+            path,
             None,
             False,
-            "",
-            error_msg
+            SkipReason.NONE,
+            (ErrorKind.WORKER, _format_worker_error(e))
         )
@@ -5,15 +5,21 @@ Provides CompressionStats class for tracking and displaying
 compression results and metrics.
 """
 
+import functools
 from typing import Optional
 from rich.console import Console
 from rich.table import Table
 
 from .compression import CompressionResult
 from .file_utils import format_size, format_duration
+from .multiprocessing_utils import SkipReason, format_skip_reason
 import time
 
-console = Console()
+
+@functools.cache
+def get_console() -> Console:
+    """Ленивый общий Console: не создаётся при импорте модуля воркером."""
+    return Console()
 
 
 class CompressionStats:
@@ -28,7 +34,7 @@ class CompressionStats:
         failed: Number of failed compressions
         original_size_total: Total original size of all successfully compressed files
         compressed_size_total: Total compressed size of all successfully compressed files
-        skipped_reasons: Dictionary counting reasons for skipping files
+        skipped_reasons: Flat array of counters indexed by SkipReason
     """
 
     def __init__(self):
@@ -40,7 +46,9 @@ class CompressionStats:
         self.failed = 0
         self.original_size_total = 0
         self.compressed_size_total = 0
-        self.skipped_reasons = {}
+        # Плоский массив счётчиков вместо словаря: инкремент по индексу
+        # enum-кода без хеширования, подписи рендерятся только в print_summary
+        self.skipped_reasons = [0] * len(SkipReason)
         self.start_time = None
         self.end_time = None
         self.processed_path = None  # type: Optional[str]
@@ -68,7 +76,10 @@ class CompressionStats:
         return end - self.start_time
 
     def add_result(
-        self, result: CompressionResult, skipped: bool = False, reason: str = ""
+        self,
+        result: CompressionResult,
+        skipped: bool = False,
+        reason: SkipReason = SkipReason.NONE,
     ):
         """
         Add a compression result to statistics.
@@ -76,14 +87,14 @@ class CompressionStats:
         Args:
             result: CompressionResult object
             skipped: Whether file was skipped
-            reason: Reason for skipping (if applicable)
+            reason: SkipReason code (if applicable)
         """
         self.processed += 1
 
         if skipped:
             self.skipped += 1
             if reason:
-                self.skipped_reasons[reason] = self.skipped_reasons.get(reason, 0) + 1
+                self.skipped_reasons[reason] += 1
         elif result.success:
             self.success += 1
             self.original_size_total += result.original_size
@@ -100,62 +111,128 @@ class CompressionStats:
         else:
             self.failed += 1
 
+    def add_results_batch(self, results) -> None:
+        """
+        Свернуть пачку результатов за один проход.
+
+        Счётчики накапливаются в локальных переменных и прибавляются к
+        атрибутам один раз, а причины пропуска складываются в локальный
+        массив по коду SkipReason — вместо обновления полей объекта на
+        каждый файл.
+
+        Args:
+            results: Список кортежей (result, skipped, reason) —
+                     аргументы add_result; reason — код SkipReason
+        """
+        if not results:
+            return
+
+        processed = skipped_total = success = failed = 0
+        original_total = compressed_total = 0
+        preserved = lost = 0
+        reasons = [0] * len(SkipReason)
+
+        for result, skipped, reason in results:
+            processed += 1
+            if skipped:
+                skipped_total += 1
+                if reason:
+                    reasons[reason] += 1
+            elif result.success:
+                success += 1
+                original_total += result.original_size
+                compressed_total += result.compressed_size
+
+                if hasattr(result, 'metadata_preserved'):
+                    if result.metadata_preserved:
+                        preserved += 1
+                    else:
+                        lost += 1
+
+                if hasattr(result, 'message') and 'metadata' in result.message.lower():
+                    self.metadata_warnings.append(result.message)
+            else:
+                failed += 1
+
+        self.processed += processed
+        self.skipped += skipped_total
+        self.success += success
+        self.failed += failed
+        self.original_size_total += original_total
+        self.compressed_size_total += compressed_total
+        self.metadata_preserved_count += preserved
+        self.metadata_lost_count += lost
+
+        if skipped_total:
+            counters = self.skipped_reasons
+            for idx, count in enumerate(reasons):
+                if count:
+                    counters[idx] += count
 
     def print_summary(self):
         """Print summary statistics table to console."""
-        table = Table(title="Compression Summary")
-        table.add_column("Metric", style="cyan")
-        table.add_column("Value", style="magenta")
+        # Сначала собираем все строки в локальный список (ячейки + стиль),
+        # затем один цикл add_row: вся арифметика и форматирование отделены
+        # от построения Rich-таблицы
+        rows = []
+        append = rows.append
 
         # Отобразить обрабатываемый путь (если указан)
         if self.processed_path:
-            table.add_row("Path", str(self.processed_path))
+            append(("Path", str(self.processed_path), None))
             # Добавить пустую строку для визуального разделения
-            table.add_row("", "")
+            append(("", "", None))
 
-        table.add_row("Total files", str(self.total))
-        table.add_row("Processed", str(self.processed))
-        table.add_row("Success", str(self.success), style="green")
-        table.add_row("Skipped", str(self.skipped))
-        table.add_row("Failed", str(self.failed), style="red")
+        append(("Total files", str(self.total), None))
+        append(("Processed", str(self.processed), None))
+        append(("Success", str(self.success), "green"))
+        append(("Skipped", str(self.skipped), None))
+        append(("Failed", str(self.failed), "red"))
 
         # Добавить метрики времени
         elapsed = self.get_elapsed_time()
-        table.add_row("Total time", format_duration(elapsed))
+        append(("Total time", format_duration(elapsed), None))
 
         if self.processed > 0:
             avg_time = elapsed / self.processed
-            table.add_row("Avg time per file", format_duration(avg_time))
+            append(("Avg time per file", format_duration(avg_time), None))
 
         # Добавить метрики папки перед строками сжатых файлов
         if self.total_folder_size_before > 0:
-            table.add_row("Total folder size", format_size(self.total_folder_size_before))
+            append(("Total folder size", format_size(self.total_folder_size_before), None))
             if self.total_folder_size_after > 0:
-                table.add_row("Total folder size after", format_size(self.total_folder_size_after))
+                append(("Total folder size after", format_size(self.total_folder_size_after), None))
                 saved = self.total_folder_size_before - self.total_folder_size_after
                 saved_percent = (saved / self.total_folder_size_before) * 100
-                table.add_row("Total folder saved", format_size(saved), style="green")
-                table.add_row("Total folder saved %", f"{saved_percent:.1f}%")
+                append(("Total folder saved", format_size(saved), "green"))
+                append(("Total folder saved %", f"{saved_percent:.1f}%", None))
             # Добавить пустую строку для визуального разделения
-            table.add_row("", "")
+            append(("", "", None))
 
         if self.folder_size_before > 0:
-            table.add_row("Images size before", format_size(self.folder_size_before))
+            append(("Images size before", format_size(self.folder_size_before), None))
             if self.folder_size_after > 0:
-                table.add_row("Images size after", format_size(self.folder_size_after))
+                append(("Images size after", format_size(self.folder_size_after), None))
                 saved = self.folder_size_before - self.folder_size_after
                 saved_percent = (saved / self.folder_size_before) * 100
-                table.add_row("Images saved", format_size(saved), style="green")
-                table.add_row("Images saved %", f"{saved_percent:.1f}%")
+                append(("Images saved", format_size(saved), "green"))
+                append(("Images saved %", f"{saved_percent:.1f}%", None))
 
         if self.success > 0:
             saved = self.original_size_total - self.compressed_size_total
             saved_percent = (saved / self.original_size_total) * 100
-            table.add_row("Original size", format_size(self.original_size_total))
-            table.add_row("Compressed size", format_size(self.compressed_size_total))
-            table.add_row("Saved", format_size(saved), style="green")
-            table.add_row("Saved %", f"{saved_percent:.1f}%")
+            append(("Original size", format_size(self.original_size_total), None))
+            append(("Compressed size", format_size(self.compressed_size_total), None))
+            append(("Saved", format_size(saved), "green"))
+            append(("Saved %", f"{saved_percent:.1f}%", None))
+
+        table = Table(title="Compression Summary")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="magenta")
+        for metric, value, style in rows:
+            table.add_row(metric, value, style=style)
 
+        console = get_console()
         console.print(table)
 
         if self.success > 0 and (self.metadata_preserved_count > 0 or self.metadata_lost_count > 0):
@@ -170,8 +247,9 @@ class CompressionStats:
                 for warning in unique_warnings[:10]:
                     console.print(f"  • {warning}")
 
-        if self.skipped_reasons:
+        if any(self.skipped_reasons):
             console.print("\n[bold]Skipped reasons:[/bold]")
-            for reason, count in self.skipped_reasons.items():
-                console.print(f"  • {reason}: {count}")
+            for idx, count in enumerate(self.skipped_reasons):
+                if count:
+                    console.print(f"  • {format_skip_reason(SkipReason(idx))}: {count}")
 
@@ -0,0 +1,10 @@
+"""
+Общая настройка pytest для тестов CLI.
+
+Добавляет корень пакета в sys.path, чтобы тесты импортировали модули
+как src.compression и т.д. без установки пакета.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
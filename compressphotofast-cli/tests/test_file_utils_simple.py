@@ -1,75 +1,91 @@
 #!/usr/bin/env python3
 """
 Простой тестовый скрипт для проверки функции clean_double_extensions
-Не требует установки pytest
+Параметризованные pytest-кейсы + автономный запуск без pytest
 """
-import sys
+import io
+import operator
 import os
+import sys
+
+import pytest
+
+# Для автономного запуска без pytest (conftest.py не подхватывается)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compression import clean_double_extensions
+
+
+# (имя кейса, вход, ожидаемый результат)
+CASES = [
+    # Одиночные расширения
+    ("Single .jpg", "photo.jpg", "photo"),
+    ("Single .png", "image.png", "image"),
+    ("Single .heic", "photo.HEIC", "photo"),
+    ("Single .heif", "image.heif", "image"),
+
+    # Двойные расширения (критические тесты)
+    ("Double .HEIC.jpg", "image.HEIC.jpg", "image"),
+    ("Double .heif.jpeg", "photo.heif.jpeg", "photo"),
+    ("Double .HEIF.png", "picture.HEIF.png", "picture"),
+
+    # Краевые случаи
+    ("No extension", "filename", "filename"),
+    ("Multiple dots", "my.photo.jpg", "my.photo"),
+    ("Triple extension", "image.backup.old.jpg", "image.backup.old"),
+    ("Leading dot", ".hidden.jpg", ".hidden"),
+    ("Only extension", ".jpg", ""),
+    ("Empty string", "", ""),
 
-# Добавляем src директорию в путь для импорта
-src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
-sys.path.insert(0, src_dir)
+    # Реальные примеры
+    ("Real example 1", "IMG_20240130_123456.HEIC.jpg", "IMG_20240130_123456"),
+    ("Real example 2", "Screenshot_2024.heif.jpeg", "Screenshot_2024"),
+    ("Real example 3", "my.photo.2024.HEIC.jpg", "my.photo.2024"),
+]
 
-from compression import clean_double_extensions
+# SoA-представление той же таблицы: три параллельных кортежа вместо
+# распаковки 3-кортежа на каждую итерацию; INPUTS скармливается map напрямую
+NAMES, INPUTS, EXPECTED = zip(*CASES)
 
 
-def test_function(name, input_value, expected):
-    """Запускает один тест и выводит результат"""
-    result = clean_double_extensions(input_value)
-    status = "✓ PASS" if result == expected else "✗ FAIL"
-    print(f"{status}: {name}")
-    if result != expected:
-        print(f"  Input: '{input_value}'")
-        print(f"  Expected: '{expected}'")
-        print(f"  Got: '{result}'")
-    return result == expected
+@pytest.mark.parametrize(
+    "name,input_value,expected", CASES, ids=NAMES
+)
+def test_clean_double_extensions(name, input_value, expected):
+    assert clean_double_extensions(input_value) == expected
 
 
 def main():
-    """Запускает все тесты"""
-    print("=" * 60)
-    print("Testing clean_double_extensions function")
-    print("=" * 60)
-
-    tests = [
-        # Одиночные расширения
-        ("Single .jpg", "photo.jpg", "photo"),
-        ("Single .png", "image.png", "image"),
-        ("Single .heic", "photo.HEIC", "photo"),
-        ("Single .heif", "image.heif", "image"),
-
-        # Двойные расширения (критические тесты)
-        ("Double .HEIC.jpg", "image.HEIC.jpg", "image"),
-        ("Double .heif.jpeg", "photo.heif.jpeg", "photo"),
-        ("Double .HEIF.png", "picture.HEIF.png", "picture"),
-
-        # Краевые случаи
-        ("No extension", "filename", "filename"),
-        ("Multiple dots", "my.photo.jpg", "my.photo"),
-        ("Triple extension", "image.backup.old.jpg", "image.backup.old"),
-        ("Leading dot", ".hidden.jpg", ".hidden"),
-        ("Only extension", ".jpg", ""),
-        ("Empty string", "", ""),
-
-        # Реальные примеры
-        ("Real example 1", "IMG_20240130_123456.HEIC.jpg", "IMG_20240130_123456"),
-        ("Real example 2", "Screenshot_2024.heif.jpeg", "Screenshot_2024"),
-        ("Real example 3", "my.photo.2024.HEIC.jpg", "my.photo.2024"),
-    ]
-
-    passed = 0
-    failed = 0
-
-    for test_data in tests:
-        if test_function(*test_data):
-            passed += 1
+    """Автономный запуск: результаты копятся в буфере, один write в конце."""
+    # Вывод накапливается в StringIO вместо print на каждый кейс: один
+    # syscall записи на весь прогон, без промежуточных flush
+    buf = io.StringIO()
+
+    buf.write("=" * 60 + "\n")
+    buf.write("Testing clean_double_extensions function\n")
+    buf.write("=" * 60 + "\n")
+
+    # Пакетная проверка: map по SoA-кортежу входов идёт через C-итерацию,
+    # сравнение сворачивается в sum — без ветвления и подсчёта счётчиков
+    # на каждый кейс
+    results = list(map(clean_double_extensions, INPUTS))
+    passed = sum(map(operator.eq, results, EXPECTED))
+    failed = len(CASES) - passed
+
+    for result, name, input_value, expected in zip(results, NAMES, INPUTS, EXPECTED):
+        if result == expected:
+            buf.write(f"✓ PASS: {name}\n")
         else:
-            failed += 1
+            buf.write(f"✗ FAIL: {name}\n")
+            buf.write(f"  Input: '{input_value}'\n")
+            buf.write(f"  Expected: '{expected}'\n")
+            buf.write(f"  Got: '{result}'\n")
 
-    print("=" * 60)
-    print(f"Results: {passed} passed, {failed} failed out of {len(tests)} tests")
-    print("=" * 60)
+    buf.write("=" * 60 + "\n")
+    buf.write(f"Results: {passed} passed, {failed} failed out of {len(CASES)} tests\n")
+    buf.write("=" * 60 + "\n")
 
+    sys.stdout.write(buf.getvalue())
     return failed == 0
 
 